@@ -1,6 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Upload, Download, File, Image, Archive, FileText, Trash2, Eye, MoreVertical, X, CheckCircle, AlertCircle, Clock } from 'lucide-react';
 import { FileTransferManager } from '../utils/webrtc';
+import { getActiveWebRTCManager, onActiveWebRTCManager } from '../utils/session';
 
 interface FileItem {
   id: string;
@@ -47,38 +48,77 @@ const FileTransfer: React.FC = () => {
   
   const fileInputRef = useRef<HTMLInputElement>(null);
   const fileTransferManager = useRef<FileTransferManager | null>(null);
+  const receivedData = useRef<Map<string, ArrayBuffer>>(new Map());
 
   useEffect(() => {
     // Initialize file transfer manager
     fileTransferManager.current = new FileTransferManager();
     
+    // On the receiving peer no upload creates a list entry, so append one
+    // the first time progress or completion arrives for an unknown name.
+    // Size and type come from the active transfer's metadata when present.
+    const receivedFileItem = (fileName: string, progress: number, size = 0): FileItem => {
+      const transfer = fileTransferManager.current
+        ?.getActiveTransfers()
+        .find(t => t.fileName === fileName);
+      return {
+        id: Date.now().toString() + Math.random().toString(36).substr(2, 9),
+        name: fileName,
+        size: size || transfer?.fileSize || 0,
+        type: transfer?.fileType || '',
+        uploadDate: new Date(),
+        status: progress === 100 ? 'completed' : 'uploading',
+        progress
+      };
+    };
+
     fileTransferManager.current.onProgress((progress, fileName) => {
-      setFiles(prev => prev.map(file => 
-        file.name === fileName 
-          ? { ...file, progress, status: progress === 100 ? 'completed' : 'uploading' }
-          : file
-      ));
+      setFiles(prev => prev.some(file => file.name === fileName)
+        ? prev.map(file =>
+            file.name === fileName
+              ? { ...file, progress, status: progress === 100 ? 'completed' : 'uploading' }
+              : file
+          )
+        : [...prev, receivedFileItem(fileName, progress)]
+      );
     });
 
     fileTransferManager.current.onComplete((fileName, data) => {
       console.log('File transfer completed:', fileName, data.byteLength, 'bytes');
-      setFiles(prev => prev.map(file => 
-        file.name === fileName 
-          ? { ...file, status: 'completed', progress: 100 }
-          : file
-      ));
+      // Keep the received bytes so download/preview serve the real file.
+      // Blob wraps the buffer without copying it.
+      receivedData.current.set(fileName, data);
+      setFiles(prev => prev.some(file => file.name === fileName)
+        ? prev.map(file =>
+            file.name === fileName
+              ? { ...file, status: 'completed', progress: 100 }
+              : file
+          )
+        : [...prev, receivedFileItem(fileName, 100, data.byteLength)]
+      );
     });
 
     fileTransferManager.current.onError((error, fileName) => {
       console.error('File transfer error:', error, fileName);
-      setFiles(prev => prev.map(file => 
-        file.name === fileName 
+      setFiles(prev => prev.map(file =>
+        file.name === fileName
           ? { ...file, status: 'failed' }
           : file
       ));
     });
 
+    // Ride the active session's long-lived file-transfer channel; without
+    // a session, uploads fall back to the demo simulation
+    const unsubscribe = onActiveWebRTCManager(manager => {
+      if (manager && fileTransferManager.current) {
+        manager.onFileChannel(channel => {
+          fileTransferManager.current?.setDataChannel(channel);
+        });
+      }
+    });
+
     return () => {
+      unsubscribe();
       fileTransferManager.current = null;
     };
   }, []);
@@ -187,16 +227,16 @@ const FileTransfer: React.FC = () => {
 
       setFiles(prev => [...prev, fileItem]);
 
-      // Start file transfer
-      if (fileTransferManager.current) {
-        try {
-          await fileTransferManager.current.sendFile(file);
-        } catch (error) {
+      // Start file transfer. Transfers are queued without waiting for the
+      // previous one to finish - the send pump interleaves them, so one
+      // slow file no longer stalls everything queued behind it.
+      if (fileTransferManager.current && getActiveWebRTCManager()) {
+        fileTransferManager.current.sendFile(file).catch(error => {
           console.error('Failed to send file:', error);
-          setFiles(prev => prev.map(f => 
+          setFiles(prev => prev.map(f =>
             f.id === fileItem.id ? { ...f, status: 'failed' } : f
           ));
-        }
+        });
       } else {
         // Simulate file upload progress for demo
         simulateFileUpload(fileItem);
@@ -252,6 +292,9 @@ const FileTransfer: React.FC = () => {
   };
 
   const deleteSelectedFiles = () => {
+    files
+      .filter(f => selectedFiles.includes(f.id))
+      .forEach(f => receivedData.current.delete(f.name));
     setFiles(prev => prev.filter(f => !selectedFiles.includes(f.id)));
     setSelectedFiles([]);
   };
@@ -285,8 +328,12 @@ const FileTransfer: React.FC = () => {
   };
 
   const downloadFile = (file: FileItem) => {
-    // Create a blob URL for download simulation
-    const blob = new Blob(['File content for ' + file.name], { type: file.type });
+    // Serve the actual received bytes when we have them; fall back to
+    // placeholder content for demo entries that were never transferred.
+    const data = receivedData.current.get(file.name);
+    const blob = data
+      ? new Blob([data], { type: file.type })
+      : new Blob(['File content for ' + file.name], { type: file.type });
     const url = URL.createObjectURL(blob);
     const link = document.createElement('a');
     link.href = url;
@@ -4,6 +4,7 @@ import {
   Mouse, Keyboard, Maximize2, Volume2, VolumeX, MousePointer, Hand, Move
 } from 'lucide-react';
 import { WebRTCManager, SignalingService, InputHandler, ConnectionQuality } from '../utils/webrtc';
+import { setActiveWebRTCManager } from '../utils/session';
 
 interface RemoteViewerProps {
   onConnectionChange: (state: any) => void;
@@ -28,6 +29,8 @@ const RemoteViewer: React.FC<RemoteViewerProps> = ({ onConnectionChange }) => {
   const webrtcManager = useRef<WebRTCManager | null>(null);
   const signalingService = useRef<SignalingService | null>(null);
   const inputHandler = useRef<InputHandler | null>(null);
+  const demoAnimationFrame = useRef(0);
+  const qualityInterval = useRef(0);
 
   useEffect(() => {
     initializeConnection();
@@ -77,7 +80,7 @@ const RemoteViewer: React.FC<RemoteViewerProps> = ({ onConnectionChange }) => {
 
       webrtcManager.current.onRemoteStream((stream) => {
         console.log('Received remote stream');
-        if (videoRef.current) {
+        if (videoRef.current && videoRef.current.srcObject !== stream) {
           videoRef.current.srcObject = stream;
         }
       });
@@ -135,6 +138,8 @@ const RemoteViewer: React.FC<RemoteViewerProps> = ({ onConnectionChange }) => {
 
       // Initialize WebRTC connection
       await webrtcManager.current.initializeConnection(false);
+      // Publish the session so other views (file transfer) can bind to it
+      setActiveWebRTCManager(webrtcManager.current);
       
       // Connect to signaling server
       await signalingService.current.connect();
@@ -265,9 +270,9 @@ const RemoteViewer: React.FC<RemoteViewerProps> = ({ onConnectionChange }) => {
         mouseX = Math.max(0, Math.min(canvas.width, mouseX));
         mouseY = Math.max(0, Math.min(canvas.height, mouseY));
         
-        requestAnimationFrame(animate);
+        demoAnimationFrame.current = requestAnimationFrame(animate);
       };
-      
+
       animate();
       
       // Convert canvas to video stream
@@ -288,7 +293,7 @@ const RemoteViewer: React.FC<RemoteViewerProps> = ({ onConnectionChange }) => {
         });
       };
 
-      setInterval(updateQuality, 2000);
+      qualityInterval.current = window.setInterval(updateQuality, 2000);
       updateQuality();
     }
   };
@@ -300,11 +305,9 @@ const RemoteViewer: React.FC<RemoteViewerProps> = ({ onConnectionChange }) => {
       
       inputHandler.current.onMouse((event) => {
         if (webrtcManager.current && isControlEnabled) {
-          webrtcManager.current.sendData({
-            type: 'input',
-            inputType: 'mouse',
-            ...event
-          });
+          // Mouse events take the binary fast path; the receiving side
+          // decodes them back into the same { type: 'input' } shape
+          webrtcManager.current.sendMouseEvent(event);
         }
       });
 
@@ -350,12 +353,25 @@ const RemoteViewer: React.FC<RemoteViewerProps> = ({ onConnectionChange }) => {
   };
 
   const cleanup = () => {
+    // The demo render loop and quality timer outlive the component unless
+    // cancelled here - a leaked rAF loop keeps painting a 1080p canvas
+    // (and holding the canvas alive) long after unmount
+    if (demoAnimationFrame.current) {
+      cancelAnimationFrame(demoAnimationFrame.current);
+      demoAnimationFrame.current = 0;
+    }
+    if (qualityInterval.current) {
+      clearInterval(qualityInterval.current);
+      qualityInterval.current = 0;
+    }
+
     if (inputHandler.current) {
       inputHandler.current.destroy();
       inputHandler.current = null;
     }
     
     if (webrtcManager.current) {
+      setActiveWebRTCManager(null);
       webrtcManager.current.close();
       webrtcManager.current = null;
     }
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Monitor, Users, Copy, Check, AlertCircle, Play, Square, Settings, Maximize2, Pause, Volume2, VolumeX } from 'lucide-react';
 import { WebRTCManager, SignalingService, ConnectionQuality, AudioProcessor } from '../utils/webrtc';
+import { setActiveWebRTCManager } from '../utils/session';
 
 interface ScreenShareProps {
   onConnectionChange: (state: any) => void;
@@ -45,6 +46,8 @@ const ScreenShare: React.FC<ScreenShareProps> = ({ onConnectionChange }) => {
       // Initialize WebRTC manager
       webrtcManager.current = new WebRTCManager();
       await webrtcManager.current.initializeConnection(true);
+      // Publish the session so other views (file transfer) can bind to it
+      setActiveWebRTCManager(webrtcManager.current);
 
       // Initialize signaling service
       signalingService.current = new SignalingService(sessionId);
@@ -147,6 +150,7 @@ const ScreenShare: React.FC<ScreenShareProps> = ({ onConnectionChange }) => {
 
   const cleanup = () => {
     if (webrtcManager.current) {
+      setActiveWebRTCManager(null);
       webrtcManager.current.close();
       webrtcManager.current = null;
     }
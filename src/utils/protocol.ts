@@ -0,0 +1,169 @@
+// Binary wire framing for data channel payloads.
+//
+// Control messages (file-start, file-complete, chat, ...) stay as JSON
+// text messages; bulk payloads like file chunks are framed as binary
+// messages so the bytes travel untouched instead of being expanded ~4x
+// into JSON arrays of numbers and re-parsed on the far side.
+//
+// Frame layout (big-endian):
+//   offset 0  u8   message type (BINARY_* constant)
+//   offset 1  u32  transfer sequence number
+//   offset 5  u32  chunk index
+//   offset 9  ...  payload bytes
+
+export const BINARY_FILE_CHUNK = 1;
+export const BINARY_MOUSE_EVENT = 2;
+
+// Field offsets are bound once here so the encoder and decoder can never
+// disagree about the layout - the JS analogue of precompiling the format
+// string instead of repeating magic offsets at every call site.
+const HDR_TYPE = 0;
+const HDR_SEQ = 1;
+const HDR_CHUNK_INDEX = 5;
+
+export const BINARY_HEADER_SIZE = 9;
+
+export interface BinaryMessage {
+  type: number;
+  transferSeq: number;
+  chunkIndex: number;
+  payload: Uint8Array;
+}
+
+// Frames are assembled in a single reusable scratch buffer:
+// RTCDataChannel.send copies its argument synchronously, so the scratch can
+// be overwritten as soon as the call returns, and steady-state sending
+// allocates no per-chunk buffers. The scratch grows on demand for payloads
+// larger than the default 64 KB chunk.
+let scratch = new ArrayBuffer(BINARY_HEADER_SIZE + 64 * 1024);
+let scratchView = new DataView(scratch);
+
+// Generic encoder: any binary message type shares the same header layout
+// and the same scratch buffer, so adding a message type costs a constant,
+// not another framing path.
+export function encodeBinaryMessage(type: number, transferSeq: number, chunkIndex: number, payload: Uint8Array): Uint8Array {
+  const size = BINARY_HEADER_SIZE + payload.length;
+  if (scratch.byteLength < size) {
+    scratch = new ArrayBuffer(size);
+    scratchView = new DataView(scratch);
+  }
+
+  scratchView.setUint8(HDR_TYPE, type);
+  scratchView.setUint32(HDR_SEQ, transferSeq);
+  scratchView.setUint32(HDR_CHUNK_INDEX, chunkIndex);
+  new Uint8Array(scratch, BINARY_HEADER_SIZE, payload.length).set(payload);
+
+  return new Uint8Array(scratch, 0, size);
+}
+
+export function encodeFileChunk(transferSeq: number, chunkIndex: number, payload: Uint8Array): Uint8Array {
+  return encodeBinaryMessage(BINARY_FILE_CHUNK, transferSeq, chunkIndex, payload);
+}
+
+// Mouse events get a fixed-size schema instead of JSON: they fire at
+// hundreds per second during drags, and the payload is a handful of small
+// numbers that fit in 32 bytes. The type byte at offset 0 is shared with
+// the generic framing so receivers can dispatch on it.
+//
+// Layout (big-endian):
+//   offset 0   u8   BINARY_MOUSE_EVENT
+//   offset 1   u8   subtype (index into MOUSE_EVENT_TYPES)
+//   offset 2   i8   button
+//   offset 3   u8   deltaMode
+//   offset 4   i16  x
+//   offset 6   i16  y
+//   offset 8   f32  deltaX
+//   offset 12  f32  deltaY
+//   offset 16  f32  deltaZ
+//   offset 20  f32  pressure
+//   offset 24  f64  timestamp
+
+export const MOUSE_EVENT_SIZE = 32;
+
+const ME_TYPE = 0;
+const ME_SUBTYPE = 1;
+const ME_BUTTON = 2;
+const ME_DELTA_MODE = 3;
+const ME_X = 4;
+const ME_Y = 6;
+const ME_DELTA_X = 8;
+const ME_DELTA_Y = 12;
+const ME_DELTA_Z = 16;
+const ME_PRESSURE = 20;
+const ME_TIMESTAMP = 24;
+
+const MOUSE_EVENT_TYPES = ['mousedown', 'mouseup', 'mousemove', 'wheel'] as const;
+
+export interface MouseEventFrame {
+  type: typeof MOUSE_EVENT_TYPES[number];
+  button: number;
+  x: number;
+  y: number;
+  deltaX: number;
+  deltaY: number;
+  deltaZ: number;
+  deltaMode: number;
+  pressure: number;
+  timestamp: number;
+}
+
+export function encodeMouseEvent(event: {
+  type: string;
+  button: number;
+  x: number;
+  y: number;
+  deltaX?: number;
+  deltaY?: number;
+  deltaZ?: number;
+  deltaMode?: number;
+  pressure?: number;
+  timestamp: number;
+}): Uint8Array {
+  scratchView.setUint8(ME_TYPE, BINARY_MOUSE_EVENT);
+  scratchView.setUint8(ME_SUBTYPE, Math.max(0, MOUSE_EVENT_TYPES.indexOf(event.type as typeof MOUSE_EVENT_TYPES[number])));
+  scratchView.setInt8(ME_BUTTON, event.button);
+  scratchView.setUint8(ME_DELTA_MODE, event.deltaMode || 0);
+  scratchView.setInt16(ME_X, event.x);
+  scratchView.setInt16(ME_Y, event.y);
+  scratchView.setFloat32(ME_DELTA_X, event.deltaX || 0);
+  scratchView.setFloat32(ME_DELTA_Y, event.deltaY || 0);
+  scratchView.setFloat32(ME_DELTA_Z, event.deltaZ || 0);
+  scratchView.setFloat32(ME_PRESSURE, event.pressure || 0);
+  scratchView.setFloat64(ME_TIMESTAMP, event.timestamp);
+
+  return new Uint8Array(scratch, 0, MOUSE_EVENT_SIZE);
+}
+
+export function decodeMouseEvent(buffer: ArrayBuffer): MouseEventFrame | null {
+  if (buffer.byteLength < MOUSE_EVENT_SIZE) {
+    return null;
+  }
+
+  const view = new DataView(buffer);
+  return {
+    type: MOUSE_EVENT_TYPES[view.getUint8(ME_SUBTYPE)] || 'mousemove',
+    button: view.getInt8(ME_BUTTON),
+    deltaMode: view.getUint8(ME_DELTA_MODE),
+    x: view.getInt16(ME_X),
+    y: view.getInt16(ME_Y),
+    deltaX: view.getFloat32(ME_DELTA_X),
+    deltaY: view.getFloat32(ME_DELTA_Y),
+    deltaZ: view.getFloat32(ME_DELTA_Z),
+    pressure: view.getFloat32(ME_PRESSURE),
+    timestamp: view.getFloat64(ME_TIMESTAMP)
+  };
+}
+
+export function decodeBinaryMessage(buffer: ArrayBuffer): BinaryMessage | null {
+  if (buffer.byteLength < BINARY_HEADER_SIZE) {
+    return null;
+  }
+
+  const view = new DataView(buffer);
+  return {
+    type: view.getUint8(HDR_TYPE),
+    transferSeq: view.getUint32(HDR_SEQ),
+    chunkIndex: view.getUint32(HDR_CHUNK_INDEX),
+    payload: new Uint8Array(buffer, BINARY_HEADER_SIZE)
+  };
+}
@@ -0,0 +1,29 @@
+import { WebRTCManager } from './webrtc';
+
+// The hosting/viewing components each own the WebRTCManager for the active
+// session, but other views - file transfer in particular - need to reach
+// the same connection to use its data channels. This module tracks the
+// manager of the currently active session so those views can bind to it
+// without threading props through the whole component tree.
+
+let activeManager: WebRTCManager | null = null;
+const listeners = new Set<(manager: WebRTCManager | null) => void>();
+
+export function setActiveWebRTCManager(manager: WebRTCManager | null): void {
+  activeManager = manager;
+  listeners.forEach(listener => listener(manager));
+}
+
+export function getActiveWebRTCManager(): WebRTCManager | null {
+  return activeManager;
+}
+
+// Subscribe to session changes; fires immediately if a session is already
+// active. Returns an unsubscribe function.
+export function onActiveWebRTCManager(listener: (manager: WebRTCManager | null) => void): () => void {
+  listeners.add(listener);
+  if (activeManager) {
+    listener(activeManager);
+  }
+  return () => listeners.delete(listener);
+}
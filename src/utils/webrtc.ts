@@ -1,3 +1,5 @@
+import { BINARY_FILE_CHUNK, BINARY_MOUSE_EVENT, decodeBinaryMessage, decodeMouseEvent, encodeFileChunk, encodeMouseEvent } from './protocol';
+
 export interface PeerConfig {
   iceServers: RTCIceServer[];
   sdpSemantics?: 'plan-b' | 'unified-plan';
@@ -23,6 +25,9 @@ export interface SignalMessage {
 export class WebRTCManager {
   private peerConnection: RTCPeerConnection | null = null;
   private dataChannel: RTCDataChannel | null = null;
+  private fileChannel: RTCDataChannel | null = null;
+  private inputChannel: RTCDataChannel | null = null;
+  private onFileChannelCallback?: (channel: RTCDataChannel) => void;
   private localStream: MediaStream | null = null;
   private remoteStream: MediaStream | null = null;
   private onRemoteStreamCallback?: (stream: MediaStream) => void;
@@ -65,7 +70,10 @@ export class WebRTCManager {
 
       this.peerConnection.ontrack = (event) => {
         console.log('Received remote track:', event.track.kind);
-        if (event.streams && event.streams[0]) {
+        // ontrack fires once per track on the same MediaStream; only a new
+        // stream should be handed to consumers, otherwise the video element
+        // sink gets torn down and rebuilt for every track
+        if (event.streams && event.streams[0] && event.streams[0] !== this.remoteStream) {
           this.remoteStream = event.streams[0];
           if (this.onRemoteStreamCallback) {
             this.onRemoteStreamCallback(this.remoteStream);
@@ -98,16 +106,38 @@ export class WebRTCManager {
       this.peerConnection.ondatachannel = (event) => {
         console.log('Received data channel:', event.channel.label);
         const channel = event.channel;
-        this.setupDataChannel(channel);
+        if (channel.label === 'file-transfer') {
+          this.setupFileChannel(channel);
+        } else if (channel.label === 'input') {
+          this.setupInputChannel(channel);
+        } else {
+          this.setupDataChannel(channel);
+        }
       };
 
-      // Create data channel if host
+      // Create data channels if host. Both channels are created once and
+      // reused for the lifetime of the connection so individual transfers
+      // never pay channel setup/teardown.
       if (isHost) {
+        // Fully reliable: control traffic includes clicks and key events,
+        // which must never be silently dropped (a lost mouseup leaves a
+        // button stuck). Loss-tolerant traffic goes to the input channel.
         this.dataChannel = this.peerConnection.createDataChannel('control', {
-          ordered: true,
-          maxRetransmits: 3
+          ordered: true
         });
         this.setupDataChannel(this.dataChannel);
+
+        this.setupFileChannel(this.peerConnection.createDataChannel('file-transfer', {
+          ordered: true
+        }));
+
+        // Unordered and unreliable: a lost or late mouse move is obsolete
+        // by the time it could be retransmitted, and skipping recovery
+        // keeps the path free of head-of-line blocking
+        this.setupInputChannel(this.peerConnection.createDataChannel('input', {
+          ordered: false,
+          maxRetransmits: 0
+        }));
       }
 
     } catch (error) {
@@ -118,12 +148,30 @@ export class WebRTCManager {
 
   private setupDataChannel(channel: RTCDataChannel): void {
     this.dataChannel = channel;
+    channel.binaryType = 'arraybuffer';
 
     channel.onopen = () => {
       console.log(`Data channel '${channel.label}' opened`);
     };
 
     channel.onmessage = (event) => {
+      // Only text messages are JSON; binary payloads are handed through
+      // untouched so they never take a parse/serialize round-trip. Mouse
+      // events use the fixed binary schema and are decoded back into the
+      // message shape consumers already handle.
+      if (typeof event.data !== 'string') {
+        if (!this.onDataChannelMessage) return;
+        if (event.data instanceof ArrayBuffer && event.data.byteLength > 0 &&
+            new DataView(event.data).getUint8(0) === BINARY_MOUSE_EVENT) {
+          const mouse = decodeMouseEvent(event.data);
+          if (mouse) {
+            this.onDataChannelMessage({ type: 'input', inputType: 'mouse', ...mouse });
+          }
+          return;
+        }
+        this.onDataChannelMessage(event.data);
+        return;
+      }
       try {
         const data = JSON.parse(event.data);
         if (this.onDataChannelMessage) {
@@ -143,6 +191,51 @@ export class WebRTCManager {
     };
   }
 
+  private setupFileChannel(channel: RTCDataChannel): void {
+    this.fileChannel = channel;
+
+    channel.onopen = () => {
+      console.log(`Data channel '${channel.label}' opened`);
+    };
+
+    channel.onerror = (error) => {
+      console.error('File channel error:', error);
+    };
+
+    channel.onclose = () => {
+      console.log(`Data channel '${channel.label}' closed`);
+    };
+
+    if (this.onFileChannelCallback) {
+      this.onFileChannelCallback(channel);
+    }
+  }
+
+  private setupInputChannel(channel: RTCDataChannel): void {
+    this.inputChannel = channel;
+    channel.binaryType = 'arraybuffer';
+
+    channel.onopen = () => {
+      console.log(`Data channel '${channel.label}' opened`);
+    };
+
+    channel.onmessage = (event) => {
+      if (!(event.data instanceof ArrayBuffer) || !this.onDataChannelMessage) return;
+      const mouse = decodeMouseEvent(event.data);
+      if (mouse) {
+        this.onDataChannelMessage({ type: 'input', inputType: 'mouse', ...mouse });
+      }
+    };
+
+    channel.onerror = (error) => {
+      console.error('Input channel error:', error);
+    };
+
+    channel.onclose = () => {
+      console.log(`Data channel '${channel.label}' closed`);
+    };
+  }
+
   async startScreenShare(): Promise<MediaStream> {
     try {
       const constraints: DisplayMediaStreamConstraints = {
@@ -164,6 +257,15 @@ export class WebRTCManager {
       const stream = await navigator.mediaDevices.getDisplayMedia(constraints);
       this.localStream = stream;
 
+      // Tell the encoder this is screen content: 'detail' biases it toward
+      // sharp static regions and skipping unchanged areas between frames,
+      // which is where desktop workloads win most of their bandwidth
+      stream.getVideoTracks().forEach(track => {
+        if ('contentHint' in track) {
+          track.contentHint = 'detail';
+        }
+      });
+
       // Add tracks to peer connection
       if (this.peerConnection) {
         // Remove existing tracks first
@@ -178,6 +280,11 @@ export class WebRTCManager {
           console.log('Adding track:', track.kind, track.label);
           this.peerConnection!.addTrack(track, stream);
         });
+
+        // H.264 is the codec most widely backed by hardware encoders, which
+        // keeps a full-resolution screen stream off the CPU
+        this.preferVideoCodec('video/H264');
+        this.tuneVideoSenders();
       }
 
       // Handle stream end
@@ -193,6 +300,61 @@ export class WebRTCManager {
     }
   }
 
+  private preferVideoCodec(mimeType: string): void {
+    if (!this.peerConnection || typeof RTCRtpSender === 'undefined' ||
+        typeof RTCRtpSender.getCapabilities !== 'function') {
+      return;
+    }
+
+    try {
+      const capabilities = RTCRtpSender.getCapabilities('video');
+      if (!capabilities) return;
+
+      const wanted = mimeType.toLowerCase();
+      const preferred = capabilities.codecs.filter(c => c.mimeType.toLowerCase() === wanted);
+      if (preferred.length === 0) return;
+
+      const rest = capabilities.codecs.filter(c => c.mimeType.toLowerCase() !== wanted);
+      this.peerConnection.getTransceivers().forEach(transceiver => {
+        if (transceiver.sender.track?.kind === 'video' &&
+            typeof transceiver.setCodecPreferences === 'function') {
+          transceiver.setCodecPreferences([...preferred, ...rest]);
+        }
+      });
+    } catch (error) {
+      // Codec reordering is best-effort; the negotiated default still works
+      console.warn('Failed to set codec preferences:', error);
+    }
+  }
+
+  // Encoder parameters suited to screen content: under congestion, drop
+  // frame rate before resolution (blurry text is unreadable, a slightly
+  // choppy desktop is fine) and cap bitrate/framerate so one 1080p screen
+  // stream can't starve the data channels sharing the connection
+  private tuneVideoSenders(): void {
+    if (!this.peerConnection) return;
+
+    this.peerConnection.getSenders().forEach(sender => {
+      if (sender.track?.kind !== 'video') return;
+
+      try {
+        const params = sender.getParameters();
+        params.degradationPreference = 'maintain-resolution';
+        if (!params.encodings || params.encodings.length === 0) {
+          params.encodings = [{}];
+        }
+        params.encodings[0].maxBitrate = 8 * 1000 * 1000;
+        params.encodings[0].maxFramerate = 30;
+        sender.setParameters(params).catch(error => {
+          console.warn('Failed to set sender parameters:', error);
+        });
+      } catch (error) {
+        // Parameter tuning is best-effort; defaults still work
+        console.warn('Failed to tune video sender:', error);
+      }
+    });
+  }
+
   stopScreenShare(): void {
     if (this.localStream) {
       this.localStream.getTracks().forEach(track => {
@@ -314,6 +476,30 @@ export class WebRTCManager {
     return false;
   }
 
+  // Fast path for mouse events: fixed 32-byte binary frames instead of
+  // JSON. At drag-time event rates the stringify/parse pair is the dominant
+  // per-event cost and the JSON text is several times larger on the wire.
+  sendMouseEvent(event: MouseInputEvent): boolean {
+    // Moves ride the lossy low-latency channel - a dropped move is
+    // superseded by the next one anyway. Clicks and wheel events must not
+    // be lost or reordered, so they stay on the reliable control channel.
+    const channel = event.type === 'mousemove' &&
+      this.inputChannel && this.inputChannel.readyState === 'open'
+      ? this.inputChannel
+      : this.dataChannel;
+
+    if (channel && channel.readyState === 'open') {
+      try {
+        channel.send(encodeMouseEvent(event));
+        return true;
+      } catch (error) {
+        console.error('Failed to send mouse event:', error);
+        return false;
+      }
+    }
+    return false;
+  }
+
   private startQualityMonitoring(): void {
     this.qualityInterval = window.setInterval(async () => {
       if (this.peerConnection) {
@@ -356,14 +542,11 @@ export class WebRTCManager {
       if (report.type === 'inbound-rtp' && report.mediaType === 'video') {
         // Calculate bandwidth from bytes received
         if (report.bytesReceived && this.statsHistory.length > 1) {
+          // RTCStatsReport is a maplike keyed by report id, so the previous
+          // sample is a direct lookup rather than a scan of every report
           const prevStats = this.statsHistory[this.statsHistory.length - 2];
-          let prevReport: any = null;
-          prevStats.forEach(prev => {
-            if (prev.id === report.id) {
-              prevReport = prev;
-            }
-          });
-          
+          const prevReport: any = prevStats.get(report.id);
+
           if (prevReport && prevReport.bytesReceived) {
             const bytesDiff = report.bytesReceived - prevReport.bytesReceived;
             const timeDiff = (report.timestamp - prevReport.timestamp) / 1000;
@@ -424,6 +607,16 @@ export class WebRTCManager {
       this.dataChannel = null;
     }
 
+    if (this.fileChannel) {
+      this.fileChannel.close();
+      this.fileChannel = null;
+    }
+
+    if (this.inputChannel) {
+      this.inputChannel.close();
+      this.inputChannel = null;
+    }
+
     if (this.peerConnection) {
       this.peerConnection.close();
       this.peerConnection = null;
@@ -441,6 +634,17 @@ export class WebRTCManager {
     this.onDataChannelMessage = callback;
   }
 
+  onFileChannel(callback: (channel: RTCDataChannel) => void): void {
+    this.onFileChannelCallback = callback;
+    if (this.fileChannel) {
+      callback(this.fileChannel);
+    }
+  }
+
+  getFileChannel(): RTCDataChannel | null {
+    return this.fileChannel;
+  }
+
   onConnectionState(callback: (state: RTCPeerConnectionState) => void): void {
     this.onConnectionStateChange = callback;
   }
@@ -461,8 +665,8 @@ export class InputHandler {
   private onKeyEvent?: (event: KeyboardInputEvent) => void;
   private mousePressed = false;
   private lastMousePosition = { x: 0, y: 0 };
-  private mouseMoveThrottle = 16; // ~60fps
-  private lastMouseMoveTime = 0;
+  private pendingMouseMove: MouseEvent | null = null;
+  private mouseMoveFrame = 0;
   private keyStates = new Set<string>();
 
   constructor(element?: HTMLElement) {
@@ -503,6 +707,11 @@ export class InputHandler {
   }
 
   private detachFromElement(): void {
+    if (this.mouseMoveFrame) {
+      cancelAnimationFrame(this.mouseMoveFrame);
+      this.mouseMoveFrame = 0;
+      this.pendingMouseMove = null;
+    }
     if (this.element) {
       this.element.removeEventListener('mousedown', this.handleMouseDown);
       this.element.removeEventListener('mouseup', this.handleMouseUp);
@@ -552,19 +761,31 @@ export class InputHandler {
 
   private handleMouseMove(event: MouseEvent): void {
     event.preventDefault();
-    
-    // Throttle mouse move events for performance
-    const now = Date.now();
-    if (now - this.lastMouseMoveTime < this.mouseMoveThrottle) {
+
+    // Coalesce mouse moves: keep only the latest event and emit it once per
+    // animation frame. Browsers can fire mousemove far faster than the remote
+    // side can usefully consume, and only the newest position matters.
+    this.pendingMouseMove = event;
+    if (this.mouseMoveFrame) {
       return;
     }
-    this.lastMouseMoveTime = now;
-    
+    this.mouseMoveFrame = requestAnimationFrame(() => this.flushMouseMove());
+  }
+
+  private flushMouseMove(): void {
+    this.mouseMoveFrame = 0;
+    const event = this.pendingMouseMove;
+    this.pendingMouseMove = null;
+    if (!event) return;
+
     const coords = this.getRelativeCoordinates(event);
+    if (coords.x === this.lastMousePosition.x && coords.y === this.lastMousePosition.y) {
+      return; // Position unchanged, nothing to report
+    }
     const deltaX = coords.x - this.lastMousePosition.x;
     const deltaY = coords.y - this.lastMousePosition.y;
     this.lastMousePosition = coords;
-    
+
     if (this.onMouseEvent) {
       this.onMouseEvent({
         type: 'mousemove',
@@ -574,7 +795,7 @@ export class InputHandler {
         deltaX,
         deltaY,
         pressure: this.mousePressed ? 1.0 : 0.0,
-        timestamp: now
+        timestamp: Date.now()
       });
     }
   }
@@ -732,6 +953,8 @@ export class SignalingService {
   private reconnectDelay = 1000;
   private isConnecting = false;
   private messageQueue: SignalMessage[] = [];
+  private serverUrl?: string;
+  private simulated = false;
 
   constructor(sessionId: string) {
     this.sessionId = sessionId;
@@ -748,25 +971,87 @@ export class SignalingService {
     }
 
     this.isConnecting = true;
+    this.serverUrl = serverUrl || this.serverUrl;
 
-    return new Promise((resolve, reject) => {
-      try {
-        // For demo purposes, simulate WebSocket connection
-        // In production, replace with actual WebSocket server
+    // Without a server URL, fall back to the simulated signaling used for
+    // the demo flows
+    if (!this.serverUrl) {
+      return new Promise((resolve) => {
         setTimeout(() => {
           this.isConnecting = false;
           this.reconnectAttempts = 0;
-          
+          this.simulated = true;
+
           if (this.onConnectionCallback) {
             this.onConnectionCallback(true);
           }
-          
+
           // Process queued messages
           this.processMessageQueue();
-          
+
           resolve();
         }, 1000 + Math.random() * 1000);
-        
+      });
+    }
+
+    return new Promise((resolve, reject) => {
+      try {
+        const websocket = new WebSocket(this.serverUrl!);
+        this.websocket = websocket;
+
+        websocket.onopen = () => {
+          console.log('Signaling connected to', this.serverUrl);
+          this.isConnecting = false;
+          this.reconnectAttempts = 0;
+
+          // Announce ourselves so the server can route messages per session
+          websocket.send(JSON.stringify({
+            type: 'join-room',
+            sessionId: this.sessionId,
+            peerId: this.peerId,
+            timestamp: Date.now()
+          }));
+
+          if (this.onConnectionCallback) {
+            this.onConnectionCallback(true);
+          }
+
+          this.processMessageQueue();
+          resolve();
+        };
+
+        websocket.onmessage = (event) => {
+          try {
+            const signal: SignalMessage = JSON.parse(event.data);
+            // The server may echo the room broadcast back to its sender
+            if (signal.peerId !== this.peerId && this.onSignalCallback) {
+              this.onSignalCallback(signal);
+            }
+          } catch (error) {
+            console.error('Error parsing signaling message:', error);
+          }
+        };
+
+        websocket.onerror = (event) => {
+          console.error('Signaling socket error:', event);
+          if (this.onErrorCallback) {
+            this.onErrorCallback(new Error('Signaling connection error'));
+          }
+          if (this.isConnecting) {
+            this.isConnecting = false;
+            reject(new Error('Failed to connect to signaling server'));
+          }
+        };
+
+        websocket.onclose = () => {
+          console.log('Signaling connection closed');
+          this.websocket = null;
+          this.isConnecting = false;
+          if (this.onConnectionCallback) {
+            this.onConnectionCallback(false);
+          }
+          this.reconnect();
+        };
       } catch (error) {
         this.isConnecting = false;
         if (this.onErrorCallback) {
@@ -802,30 +1087,45 @@ export class SignalingService {
       timestamp: Date.now()
     };
 
-    // Queue message if not connected
-    if (!this.websocket || this.websocket.readyState !== WebSocket.OPEN) {
-      this.messageQueue.push(message);
+    if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
+      try {
+        this.websocket.send(JSON.stringify(message));
+      } catch (error) {
+        console.error('Failed to send signal:', error);
+        this.enqueueSignal(message);
+      }
       return;
     }
 
-    try {
-      // In production, send via WebSocket
-      // this.websocket.send(JSON.stringify(message));
-      
-      // For demo, simulate message handling
+    if (this.simulated) {
       this.simulateSignalHandling(message);
-    } catch (error) {
-      console.error('Failed to send signal:', error);
-      this.messageQueue.push(message);
+      return;
+    }
+
+    // Queue until a connection is established
+    this.enqueueSignal(message);
+  }
+
+  private enqueueSignal(message: SignalMessage): void {
+    // Bound the queue so a long outage can't grow it without limit; old
+    // signals (stale ICE candidates, superseded offers) are the right ones
+    // to shed
+    if (this.messageQueue.length >= SignalingService.MAX_QUEUED_SIGNALS) {
+      this.messageQueue.shift();
     }
+    this.messageQueue.push(message);
   }
 
+  private static readonly MAX_QUEUED_SIGNALS = 100;
+
   private processMessageQueue(): void {
-    while (this.messageQueue.length > 0) {
-      const message = this.messageQueue.shift();
-      if (message) {
-        this.sendSignal(message);
-      }
+    // Drain a snapshot: if the connection drops mid-flush, sendSignal puts
+    // messages back on the queue, and iterating the live array would spin
+    // on them forever
+    const pending = this.messageQueue;
+    this.messageQueue = [];
+    for (const message of pending) {
+      this.sendSignal(message);
     }
   }
 
@@ -895,9 +1195,12 @@ export class SignalingService {
 
   disconnect(): void {
     if (this.websocket) {
+      // Deliberate close: drop the handler so it doesn't schedule a reconnect
+      this.websocket.onclose = null;
       this.websocket.close();
       this.websocket = null;
     }
+    this.simulated = false;
     
     this.messageQueue = [];
     this.reconnectAttempts = 0;
@@ -908,6 +1211,94 @@ export class SignalingService {
   }
 }
 
+// File transfer pacing: stop queueing chunks once this much data is sitting
+// in the data channel's send buffer, and resume once it drains below the
+// low threshold. This keeps a bounded amount in flight instead of either
+// overrunning the SCTP buffer or trickling chunks on a fixed timer.
+const MAX_BUFFERED_AMOUNT = 4 * 1024 * 1024;
+const BUFFERED_AMOUNT_LOW_THRESHOLD = 1024 * 1024;
+
+// How many queued transfers the send pump interleaves at once; the rest
+// wait in FIFO order behind them
+const MAX_CONCURRENT_SENDS = 3;
+
+// Progress callbacks are coalesced into this window so a large transfer
+// (one chunk per 64 KB) doesn't fire thousands of UI updates
+const PROGRESS_FLUSH_INTERVAL = 100;
+
+// Incoming transfers with no chunk activity for this long are abandoned
+// and their preallocated buffers released
+const TRANSFER_IDLE_TTL = 60 * 1000;
+
+// 64 KB is the largest message size that interoperates reliably across
+// browser SCTP stacks; larger chunks mean 4x fewer messages (and progress
+// updates) per file than the previous 16 KB.
+const FILE_CHUNK_SIZE = 64 * 1024;
+
+// Transfers are identified on the wire by a compact sequence number so
+// binary chunk frames don't need to carry the string transfer id
+let nextTransferSeq = 1;
+
+// One digest over the whole file, rather than a hash per chunk: chunk
+// integrity is already covered by SCTP, so a single SHA-256 both costs less
+// and catches reassembly bugs the per-chunk approach would miss.
+// SubtleCrypto is only exposed in secure contexts, so transfers fall back
+// to running unverified rather than failing outright.
+async function sha256Hex(data: ArrayBuffer | Uint8Array): Promise<string | undefined> {
+  if (typeof crypto === 'undefined' || !crypto.subtle) {
+    return undefined;
+  }
+
+  const digest = await crypto.subtle.digest('SHA-256', data);
+  const bytes = new Uint8Array(digest);
+  let hex = '';
+  for (let i = 0; i < bytes.length; i++) {
+    hex += bytes[i].toString(16).padStart(2, '0');
+  }
+  return hex;
+}
+
+// Digests keyed by file identity, so re-sending the same file (to another
+// peer, or retrying a failed transfer) skips rereading and rehashing it.
+// lastModified changes whenever the underlying file does, which invalidates
+// stale entries the same way an mtime check would.
+const fileDigestCache = new Map<string, Promise<string | undefined>>();
+const resolvedFileDigests = new Map<string, string>();
+
+// crypto.subtle.digest has no incremental API, so hashing means pulling the
+// whole file into memory at once. Chunks themselves are sliced lazily, so
+// above this size the digest is skipped (transfers run unverified) rather
+// than loading multi-GB files into RAM.
+const MAX_DIGEST_FILE_SIZE = 256 * 1024 * 1024;
+
+function digestKey(file: File): string {
+  return `${file.name}:${file.size}:${file.lastModified}`;
+}
+
+function fileDigest(file: File): Promise<string | undefined> {
+  if (file.size > MAX_DIGEST_FILE_SIZE) {
+    return Promise.resolve(undefined);
+  }
+
+  const key = digestKey(file);
+  let digest = fileDigestCache.get(key);
+  if (!digest) {
+    digest = file.arrayBuffer().then(sha256Hex).then(hex => {
+      if (hex) {
+        resolvedFileDigests.set(key, hex);
+      }
+      return hex;
+    });
+    fileDigestCache.set(key, digest);
+  }
+  return digest;
+}
+
+// Synchronous lookup for digests that have already been computed
+function cachedFileDigest(file: File): string | undefined {
+  return resolvedFileDigests.get(digestKey(file));
+}
+
 // File transfer utility
 export class FileTransferManager {
   private dataChannel: RTCDataChannel | null = null;
@@ -915,6 +1306,16 @@ export class FileTransferManager {
   private onCompleteCallback?: (fileName: string, data: ArrayBuffer) => void;
   private onErrorCallback?: (error: Error, fileName: string) => void;
   private activeTransfers = new Map<string, FileTransfer>();
+  private pendingProgress = new Map<string, number>();
+  private progressFlushTimer = 0;
+  private transfersBySeq = new Map<number, FileTransfer>();
+  private outgoing: OutgoingSend[] = [];
+  private pumping = false;
+  private rrIndex = 0;
+  // Digests of files already received, used to answer repeat offers with
+  // 'file-have' instead of taking the bytes again — the data-channel
+  // equivalent of replying 304 Not Modified to a matching If-None-Match.
+  private completedDigests = new Set<string>();
 
   constructor(dataChannel?: RTCDataChannel) {
     if (dataChannel) {
@@ -924,16 +1325,55 @@ export class FileTransferManager {
 
   setDataChannel(dataChannel: RTCDataChannel): void {
     this.dataChannel = dataChannel;
-    
+    this.dataChannel.binaryType = 'arraybuffer';
+    this.dataChannel.bufferedAmountLowThreshold = BUFFERED_AMOUNT_LOW_THRESHOLD;
+
     this.dataChannel.onmessage = (event) => {
-      try {
-        const message = JSON.parse(event.data);
-        this.handleFileMessage(message);
-      } catch (error) {
-        // Handle binary data
+      if (typeof event.data === 'string') {
+        try {
+          this.handleFileMessage(JSON.parse(event.data));
+        } catch (error) {
+          console.error('Error parsing file transfer message:', error);
+        }
+      } else {
         this.handleBinaryData(event.data);
       }
     };
+
+    // A dead channel can never drain the queue; settle every pending send
+    // so callers see a failure instead of a promise that hangs forever.
+    // This also covers sends parked on bufferedamountlow, which the pump's
+    // own readyState check never revisits.
+    this.dataChannel.onclose = () => {
+      this.failPending(new Error('Data channel closed'));
+    };
+  }
+
+  // Reject (or error-report, for sources without a promise such as resume
+  // retransmissions) everything queued for sending
+  private failPending(error: Error): void {
+    const pending = this.outgoing;
+    this.outgoing = [];
+    this.rrIndex = 0;
+    for (const source of pending) {
+      if (source.fail) {
+        source.fail(error);
+      } else if (this.onErrorCallback) {
+        this.onErrorCallback(error, source.fileName);
+      }
+      this.dropSenderTransfer(source);
+    }
+  }
+
+  // A failed send is no longer the pump's to finish: drop its sender-side
+  // transfer record (and the File handle it holds) so it does not sit in
+  // activeTransfers forever. Only completed sends get the lastActivity
+  // stamp the idle sweep looks for, so failed ones must be removed here.
+  private dropSenderTransfer(source: OutgoingSend): void {
+    const transfer = this.activeTransfers.get(source.transferId);
+    if (transfer) {
+      this.removeTransfer(transfer);
+    }
   }
 
   async sendFile(file: File): Promise<void> {
@@ -941,17 +1381,30 @@ export class FileTransferManager {
       throw new Error('Data channel not available');
     }
 
+    this.evictStaleTransfers();
+
     const transferId = this.generateTransferId();
-    const chunkSize = 16384; // 16KB chunks
-    
+    const transferSeq = nextTransferSeq++;
+    const chunkSize = FILE_CHUNK_SIZE;
+
+    // Kick off hashing but don't wait for it: chunks start flowing
+    // immediately and the digest overlaps with the network transfer. It is
+    // only awaited when sending 'file-complete', where the receiver needs
+    // it for verification. On a cache hit the digest is already known and
+    // goes into the metadata, which lets the receiver dedupe up front.
+    const digestPromise = fileDigest(file);
+    const sha256 = cachedFileDigest(file);
+
     // Send file metadata
     const metadata = {
       type: 'file-start',
       transferId,
+      transferSeq,
       fileName: file.name,
       fileSize: file.size,
       fileType: file.type,
       chunkSize,
+      sha256,
       totalChunks: Math.ceil(file.size / chunkSize)
     };
 
@@ -960,130 +1413,402 @@ export class FileTransferManager {
     // Create transfer tracking
     const transfer: FileTransfer = {
       id: transferId,
+      transferSeq,
       fileName: file.name,
       fileSize: file.size,
-      chunks: [],
+      chunkSize,
+      // Keep the File handle so missing byte ranges can be re-sliced and
+      // retransmitted if the receiver reports gaps.
+      file,
       receivedChunks: 0,
       totalChunks: metadata.totalChunks,
-      startTime: Date.now()
+      startTime: performance.now()
     };
 
     this.activeTransfers.set(transferId, transfer);
 
-    // Send file in chunks
-    const reader = new FileReader();
+    // Queue the transfer as a chunk source for the shared send pump. Each
+    // chunk is sliced from the Blob on demand, so only chunks in flight are
+    // ever materialized in memory. The returned promise settles when this
+    // transfer has actually drained (or failed), not when it was queued, so
+    // callers can track completion per file while other queued transfers
+    // keep flowing through the round-robin pump.
     let offset = 0;
     let chunkIndex = 0;
 
-    const sendNextChunk = () => {
-      if (offset >= file.size) {
-        // Send completion message
-        this.dataChannel!.send(JSON.stringify({
-          type: 'file-complete',
-          transferId
-        }));
-        return;
-      }
+    // Double buffering: while one chunk sits in the channel's send buffer,
+    // the next one is already being read from disk, so the Blob read and
+    // the network send overlap instead of strictly alternating
+    const readChunk = (at: number) => file.slice(at, at + chunkSize).arrayBuffer();
+    let nextChunk: Promise<ArrayBuffer> | null = null;
+
+    return new Promise<void>((resolve, reject) => {
+      this.outgoing.push({
+        transferId,
+        fileName: file.name,
+        done: resolve,
+        fail: reject,
+        sendNext: async () => {
+          if (offset >= file.size) {
+            const digest = await digestPromise;
+            transfer.sha256 = digest;
+            this.dataChannel!.send(JSON.stringify({
+              type: 'file-complete',
+              transferId,
+              sha256: digest
+            }));
+            // The record stays registered so a file-resume can still reach
+            // the File handle; stamping it starts the idle-eviction clock
+            transfer.lastActivity = performance.now();
+            resolve();
+            return false;
+          }
+
+          const data = await (nextChunk || readChunk(offset));
+          nextChunk = offset + chunkSize < file.size ? readChunk(offset + chunkSize) : null;
+
+          this.dataChannel!.send(encodeFileChunk(transferSeq, chunkIndex, new Uint8Array(data)));
 
-      const chunk = file.slice(offset, offset + chunkSize);
-      reader.onload = (e) => {
-        if (e.target?.result) {
-          const chunkData = {
-            type: 'file-chunk',
-            transferId,
-            chunkIndex,
-            data: Array.from(new Uint8Array(e.target.result as ArrayBuffer))
-          };
-
-          this.dataChannel!.send(JSON.stringify(chunkData));
-          
           offset += chunkSize;
           chunkIndex++;
-          
-          if (this.onProgressCallback) {
-            const progress = (offset / file.size) * 100;
-            this.onProgressCallback(Math.min(progress, 100), file.name);
-          }
-          
-          // Send next chunk with small delay to avoid overwhelming
-          setTimeout(sendNextChunk, 10);
+
+          this.reportProgress(file.name, Math.min((offset / file.size) * 100, 100));
+
+          return true;
         }
-      };
-      
-      reader.readAsArrayBuffer(chunk);
-    };
+      });
 
-    sendNextChunk();
+      this.pump();
+    });
   }
 
-  private handleFileMessage(message: any): void {
-    switch (message.type) {
-      case 'file-start':
-        this.handleFileStart(message);
-        break;
-      case 'file-chunk':
-        this.handleFileChunk(message);
-        break;
-      case 'file-complete':
-        this.handleFileComplete(message);
+  // Single send loop shared by all outgoing transfers: chunks are dealt out
+  // round-robin across the queued transfers so a large file cannot starve
+  // the ones queued behind it, and exactly one place owns the channel's
+  // backpressure ('bufferedamountlow') handler.
+  private async pump(): Promise<void> {
+    if (this.pumping) return;
+    this.pumping = true;
+
+    while (this.outgoing.length > 0) {
+      const channel = this.dataChannel;
+      if (!channel || channel.readyState !== 'open') {
+        this.failPending(new Error('Data channel closed'));
         break;
+      }
+
+      if (channel.bufferedAmount > MAX_BUFFERED_AMOUNT) {
+        channel.onbufferedamountlow = () => {
+          channel.onbufferedamountlow = null;
+          this.pump();
+        };
+        this.pumping = false;
+        return;
+      }
+
+      // Only the first few queued transfers are interleaved; the rest wait
+      // their turn. An unbounded round-robin would slow every transfer to a
+      // crawl under a burst of uploads and keep a chunk in flight per file.
+      const active = Math.min(this.outgoing.length, MAX_CONCURRENT_SENDS);
+      this.rrIndex = this.rrIndex % active;
+      const source = this.outgoing[this.rrIndex];
+
+      let more = false;
+      try {
+        more = await source.sendNext();
+      } catch (error) {
+        if (this.onErrorCallback) {
+          this.onErrorCallback(error as Error, source.fileName);
+        }
+        if (source.fail) {
+          source.fail(error as Error);
+        }
+        this.dropSenderTransfer(source);
+      }
+
+      if (more) {
+        this.rrIndex++;
+      } else {
+        const idx = this.outgoing.indexOf(source);
+        if (idx !== -1) {
+          this.outgoing.splice(idx, 1);
+        }
+      }
+    }
+
+    this.pumping = false;
+  }
+
+  // Dispatch table built once per manager: message type resolves to its
+  // handler with a single keyed lookup instead of walking a comparison
+  // chain per message
+  private readonly fileMessageHandlers: Record<string, (message: any) => void> = {
+    'file-start': (message) => this.handleFileStart(message),
+    'file-complete': (message) => this.handleFileComplete(message),
+    'file-resume': (message) => this.handleFileResume(message),
+    'file-have': (message) => this.handleFileHave(message)
+  };
+
+  private handleFileMessage(message: any): void {
+    const handler = this.fileMessageHandlers[message.type];
+    if (handler) {
+      handler(message);
     }
   }
 
   private handleFileStart(message: any): void {
+    this.evictStaleTransfers();
+
+    if (message.sha256 && this.completedDigests.has(message.sha256) &&
+        this.dataChannel?.readyState === 'open') {
+      this.dataChannel.send(JSON.stringify({
+        type: 'file-have',
+        transferId: message.transferId
+      }));
+      return;
+    }
+
     const transfer: FileTransfer = {
       id: message.transferId,
+      transferSeq: message.transferSeq,
       fileName: message.fileName,
       fileSize: message.fileSize,
       fileType: message.fileType,
-      chunks: new Array(message.totalChunks),
+      chunkSize: message.chunkSize,
+      sha256: message.sha256,
+      // Preallocate the full file once; each chunk is written straight to
+      // its offset so peak memory stays at one copy of the file instead of
+      // the file plus a list of chunk buffers.
+      buffer: new Uint8Array(message.fileSize),
+      receivedMap: new Uint8Array(message.totalChunks),
+      resumeAttempts: 0,
       receivedChunks: 0,
       totalChunks: message.totalChunks,
-      startTime: Date.now()
+      startTime: performance.now(),
+      lastActivity: performance.now()
     };
 
     this.activeTransfers.set(message.transferId, transfer);
+    if (message.transferSeq !== undefined) {
+      this.transfersBySeq.set(message.transferSeq, transfer);
+    }
   }
 
-  private handleFileChunk(message: any): void {
-    const transfer = this.activeTransfers.get(message.transferId);
-    if (!transfer) return;
+  private storeChunk(transfer: FileTransfer, chunkIndex: number, payload: Uint8Array): void {
+    if (!transfer.buffer || !transfer.receivedMap) return;
 
-    transfer.chunks[message.chunkIndex] = new Uint8Array(message.data);
+    // Validate frame boundaries before touching the preallocated buffer: a
+    // truncated or corrupt frame must be dropped, not written out of range
+    // (Uint8Array.set throws on overflow, which would kill the transfer).
+    const offset = chunkIndex * transfer.chunkSize;
+    if (chunkIndex >= transfer.totalChunks || offset + payload.length > transfer.buffer.length) {
+      console.error('Dropping out-of-range chunk', chunkIndex, 'for', transfer.fileName);
+      return;
+    }
+
+    // Retransmitted duplicates must not inflate the received count
+    if (transfer.receivedMap[chunkIndex]) return;
+    transfer.receivedMap[chunkIndex] = 1;
+
+    transfer.buffer.set(payload, offset);
     transfer.receivedChunks++;
+    transfer.lastActivity = performance.now();
+
+    this.reportProgress(transfer.fileName, (transfer.receivedChunks / transfer.totalChunks) * 100);
+  }
+
+  // Nagle-style batching for progress: per-chunk reports are collected and
+  // flushed once per PROGRESS_FLUSH_INTERVAL with only the latest value per
+  // file. Completion (100%) bypasses the window so 'done' is never delayed.
+  private reportProgress(fileName: string, progress: number): void {
+    if (!this.onProgressCallback) return;
 
+    if (progress >= 100) {
+      this.pendingProgress.delete(fileName);
+      this.onProgressCallback(100, fileName);
+      return;
+    }
+
+    this.pendingProgress.set(fileName, progress);
+    if (!this.progressFlushTimer) {
+      this.progressFlushTimer = window.setTimeout(() => this.flushProgress(), PROGRESS_FLUSH_INTERVAL);
+    }
+  }
+
+  private flushProgress(): void {
+    this.progressFlushTimer = 0;
     if (this.onProgressCallback) {
-      const progress = (transfer.receivedChunks / transfer.totalChunks) * 100;
-      this.onProgressCallback(progress, transfer.fileName);
+      this.pendingProgress.forEach((progress, fileName) => {
+        this.onProgressCallback!(progress, fileName);
+      });
+    }
+    this.pendingProgress.clear();
+  }
+
+  // Idle transfer records pin memory until removed: receivers hold a
+  // full-size preallocated buffer, and completed sender entries keep their
+  // File handle registered so file-resume can re-slice it. Both are swept
+  // lazily when new transfers arrive, the same way a tracker drops peers
+  // not seen within the TTL. Entries without a lastActivity stamp are
+  // in-flight sends, which the pump owns.
+  private evictStaleTransfers(): void {
+    const now = performance.now();
+    this.activeTransfers.forEach(transfer => {
+      if (transfer.lastActivity === undefined) return;
+      if (now - transfer.lastActivity > TRANSFER_IDLE_TTL) {
+        // Only a stalled receive is an error; an expired sender record just
+        // means the resume window closed on a finished transfer
+        if (transfer.buffer) {
+          console.warn('Evicting stalled transfer:', transfer.fileName);
+          if (this.onErrorCallback) {
+            this.onErrorCallback(new Error('Transfer timed out'), transfer.fileName);
+          }
+        }
+        this.removeTransfer(transfer);
+      }
+    });
+  }
+
+  private removeTransfer(transfer: FileTransfer): void {
+    this.activeTransfers.delete(transfer.id);
+    if (transfer.transferSeq !== undefined) {
+      this.transfersBySeq.delete(transfer.transferSeq);
     }
   }
 
   private handleFileComplete(message: any): void {
     const transfer = this.activeTransfers.get(message.transferId);
-    if (!transfer) return;
+    if (!transfer || !transfer.buffer) return;
 
-    // Combine all chunks
-    const totalSize = transfer.chunks.reduce((size, chunk) => size + (chunk?.length || 0), 0);
-    const fileData = new Uint8Array(totalSize);
-    let offset = 0;
+    // Senders that were still hashing when the transfer started deliver
+    // the digest here instead of in the metadata
+    if (message.sha256 && !transfer.sha256) {
+      transfer.sha256 = message.sha256;
+    }
 
-    for (const chunk of transfer.chunks) {
-      if (chunk) {
-        fileData.set(chunk, offset);
-        offset += chunk.length;
+    // The metadata from 'file-start' is authoritative for size and chunk
+    // count, so missing chunks are detected up front instead of silently
+    // producing a truncated file. Ask the sender to retransmit the gaps
+    // before giving up on the transfer.
+    if (transfer.receivedChunks < transfer.totalChunks) {
+      if ((transfer.resumeAttempts ?? 0) < 3 && this.dataChannel?.readyState === 'open' && transfer.receivedMap) {
+        transfer.resumeAttempts = (transfer.resumeAttempts ?? 0) + 1;
+
+        const missingChunks: number[] = [];
+        for (let i = 0; i < transfer.totalChunks; i++) {
+          if (!transfer.receivedMap[i]) {
+            missingChunks.push(i);
+          }
+        }
+
+        this.dataChannel.send(JSON.stringify({
+          type: 'file-resume',
+          transferId: transfer.id,
+          missingChunks
+        }));
+        return;
+      }
+
+      if (this.onErrorCallback) {
+        this.onErrorCallback(
+          new Error(`Transfer incomplete: ${transfer.receivedChunks}/${transfer.totalChunks} chunks received`),
+          transfer.fileName
+        );
+      }
+      this.removeTransfer(transfer);
+      return;
+    }
+
+    const buffer = transfer.buffer;
+    const finish = () => {
+      if (transfer.sha256) {
+        this.completedDigests.add(transfer.sha256);
+      }
+      if (this.onCompleteCallback) {
+        this.onCompleteCallback(transfer.fileName, buffer.buffer);
+      }
+      this.removeTransfer(transfer);
+    };
+
+    if (transfer.sha256) {
+      sha256Hex(buffer).then(hex => {
+        if (hex && hex !== transfer.sha256) {
+          if (this.onErrorCallback) {
+            this.onErrorCallback(new Error('SHA-256 mismatch on received file'), transfer.fileName);
+          }
+          this.removeTransfer(transfer);
+          return;
+        }
+        finish();
+      });
+      return;
+    }
+
+    finish();
+  }
+
+  private handleFileHave(message: any): void {
+    const transfer = this.activeTransfers.get(message.transferId);
+
+    // The receiver already has identical content; stop sending chunks,
+    // settle the caller's sendFile promise and report the transfer as done.
+    const idx = this.outgoing.findIndex(source => source.transferId === message.transferId);
+    if (idx !== -1) {
+      const [source] = this.outgoing.splice(idx, 1);
+      if (source.done) {
+        source.done();
       }
     }
 
-    if (this.onCompleteCallback) {
-      this.onCompleteCallback(transfer.fileName, fileData.buffer);
+    if (transfer) {
+      this.reportProgress(transfer.fileName, 100);
+      this.removeTransfer(transfer);
     }
+  }
+
+  private handleFileResume(message: any): void {
+    const transfer = this.activeTransfers.get(message.transferId);
+    if (!transfer || !transfer.file) return;
+
+    const missing: number[] = message.missingChunks || [];
+    const file = transfer.file;
+    let i = 0;
+
+    this.outgoing.push({
+      transferId: transfer.id,
+      fileName: transfer.fileName,
+      sendNext: async () => {
+        if (i >= missing.length) {
+          this.dataChannel!.send(JSON.stringify({
+            type: 'file-complete',
+            transferId: transfer.id,
+            sha256: transfer.sha256
+          }));
+          transfer.lastActivity = performance.now();
+          return false;
+        }
+
+        const chunkIndex = missing[i++];
+        const start = chunkIndex * transfer.chunkSize;
+        const data = await file.slice(start, start + transfer.chunkSize).arrayBuffer();
+
+        this.dataChannel!.send(encodeFileChunk(transfer.transferSeq!, chunkIndex, new Uint8Array(data)));
+
+        return true;
+      }
+    });
 
-    this.activeTransfers.delete(message.transferId);
+    this.pump();
   }
 
   private handleBinaryData(data: ArrayBuffer): void {
-    // Handle direct binary transfers if needed
-    console.log('Received binary data:', data.byteLength, 'bytes');
+    const message = decodeBinaryMessage(data);
+    if (!message || message.type !== BINARY_FILE_CHUNK) return;
+
+    const transfer = this.transfersBySeq.get(message.transferSeq);
+    if (!transfer) return;
+
+    this.storeChunk(transfer, message.chunkIndex, message.payload);
   }
 
   private generateTransferId(): string {
@@ -1107,15 +1832,37 @@ export class FileTransferManager {
   }
 }
 
+interface OutgoingSend {
+  transferId: string;
+  fileName: string;
+  // Sends one message; resolves false once the transfer has nothing left
+  sendNext(): Promise<boolean>;
+  // Settle the caller's sendFile promise when the transfer finishes outside
+  // sendNext (e.g. a file-have dedupe) or when sendNext throws
+  done?(): void;
+  fail?(error: Error): void;
+}
+
 interface FileTransfer {
   id: string;
+  transferSeq?: number;
   fileName: string;
   fileSize: number;
   fileType?: string;
-  chunks: (Uint8Array | undefined)[];
+  chunkSize: number;
+  buffer?: Uint8Array;
+  file?: File;
+  sha256?: string;
+  receivedMap?: Uint8Array;
+  resumeAttempts?: number;
   receivedChunks: number;
   totalChunks: number;
+  // performance.now() origin - monotonic, so elapsed/rate math is immune
+  // to wall-clock steps (NTP adjustments, DST)
   startTime: number;
+  // Last chunk arrival (receivers) or completion time (senders); drives
+  // idle eviction. Unset while a send is in flight.
+  lastActivity?: number;
 }
 
 // Audio processing utilities